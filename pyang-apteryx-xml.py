@@ -3,12 +3,11 @@
 Output paths in Apteryx XML file format
 
 """
-import io
-import sys
+import functools
 import os
 import optparse
-import xml.etree.ElementTree as etree
-from collections import OrderedDict
+
+from lxml import etree
 
 from pyang import error, plugin
 
@@ -17,110 +16,170 @@ def pyang_plugin_init():
     plugin.register_plugin(ApteryxXMLPlugin())
 
 
-# Patch ElementTree._serialize_xml for ordered attributes
-def _serialize_xml(write, elem, encoding, qnames, namespaces):
-    tag = elem.tag
-    text = elem.text
-    if tag is etree.Comment:
-        write("<!--%s-->" % etree._encode(text, encoding))
-    elif tag is etree.ProcessingInstruction:
-        write("<?%s?>" % etree._encode(text, encoding))
-    else:
-        tag = qnames[tag]
-        if tag is None:
-            if text:
-                write(etree._escape_cdata(text, encoding))
-            for e in elem:
-                _serialize_xml(write, e, encoding, qnames, None)
-        else:
-            write("<" + tag)
-            items = elem.items()
-            if items or namespaces:
-                if namespaces:
-                    for v, k in sorted(namespaces.items(),
-                                       key=lambda x: x[1]):  # sort on prefix
-                        if k:
-                            k = ":" + k
-                        write(" xmlns%s=\"%s\"" % (
-                            k.encode(encoding),
-                            etree._escape_attrib(v, encoding)
-                        ))
-                for k, v in items:
-                    if isinstance(k, etree.QName):
-                        k = k.text
-                    if isinstance(v, etree.QName):
-                        v = qnames[v.text]
-                    else:
-                        v = etree._escape_attrib(v, encoding)
-                    write(" %s=\"%s\"" % (qnames[k], v))
-            if text or len(elem):
-                write(">")
-                if text:
-                    write(etree._escape_cdata(text, encoding))
-                for e in elem:
-                    _serialize_xml(write, e, encoding, qnames, None)
-                write("</" + tag + ">")
-            else:
-                write("/>")
-    if elem.tail:
-        write(etree._escape_cdata(elem.tail, encoding))
-
-
-def _serialize_xml3(write, elem, qnames, namespaces,
-                    short_empty_elements, **kwargs):
-    tag = elem.tag
-    text = elem.text
-    if tag is etree.Comment:
-        write("<!--%s-->" % text)
-    elif tag is etree.ProcessingInstruction:
-        write("<?%s?>" % text)
-    else:
-        tag = qnames[tag]
-        if tag is None:
-            if text:
-                write(etree._escape_cdata(text))
-            for e in elem:
-                _serialize_xml(write, e, qnames, None,
-                               short_empty_elements=short_empty_elements)
-        else:
-            write("<" + tag)
-            items = list(elem.items())
-            if items or namespaces:
-                if namespaces:
-                    for v, k in sorted(namespaces.items(),
-                                       key=lambda x: x[1]):  # sort on prefix
-                        if k:
-                            k = ":" + k
-                        write(" xmlns%s=\"%s\"" % (
-                            k,
-                            etree._escape_attrib(v)
-                        ))
-                for k, v in items:
-                    if isinstance(k, etree.QName):
-                        k = k.text
-                    if isinstance(v, etree.QName):
-                        v = qnames[v.text]
-                    else:
-                        v = etree._escape_attrib(v)
-                    write(" %s=\"%s\"" % (qnames[k], v))
-            if text or len(elem) or not short_empty_elements:
-                write(">")
-                if text:
-                    write(etree._escape_cdata(text))
-                for e in elem:
-                    etree._serialize_xml(write, e, qnames, None,
-                                         short_empty_elements=short_empty_elements)
-                write("</" + tag + ">")
-            else:
-                write("/>")
-    if elem.tail:
-        write(etree._escape_cdata(elem.tail))
-
-
-if sys.version > "3":
-    etree._serialize_xml = _serialize_xml3
-else:
-    etree._serialize_xml = _serialize_xml
+# Default range for integer types without a range statement
+_INT_RANGES = {
+    "int8": "-128..127",
+    "int16": "-32768..32767",
+    "int32": "-2147483648..2147483647",
+    "uint8": "0..255",
+    "uint16": "0..65535",
+    "uint32": "0..4294967295",
+}
+
+# 64 bit integers are encoded as strings so are validated with a pattern
+_INT64_BOUNDS = {
+    "int64": (-(1 << 63), (1 << 63) - 1),
+    "uint64": (0, (1 << 64) - 1),
+}
+
+
+def _digit_class(lo, hi):
+    if lo == hi:
+        return str(lo)
+    if hi == lo + 1:
+        return f"[{lo}{hi}]"
+    return f"[{lo}-{hi}]"
+
+
+def _any_digits(count):
+    return "[0-9]" if count == 1 else f"[0-9]{{{count}}}"
+
+
+def _group(alts):
+    return alts[0] if len(alts) == 1 else "(" + "|".join(alts) + ")"
+
+
+def _digits_to_regex(lo, hi):
+    """Alternatives matching lo..hi, two digit strings of the same length"""
+    if len(lo) == 1:
+        return [_digit_class(int(lo), int(hi))]
+    if lo[0] == hi[0]:
+        return [lo[0] + _group(_digits_to_regex(lo[1:], hi[1:]))]
+    rest = len(lo) - 1
+    first, last = int(lo[0]), int(hi[0])
+    alts = []
+    if lo[1:] != "0" * rest:
+        alts.append(lo[0] + _group(_digits_to_regex(lo[1:], "9" * rest)))
+        first += 1
+    tail = []
+    if hi[1:] != "9" * rest:
+        tail.append(hi[0] + _group(_digits_to_regex("0" * rest, hi[1:])))
+        last -= 1
+    if first <= last:
+        alts.append(_digit_class(first, last) + _any_digits(rest))
+    return alts + tail
+
+
+def _decades_to_regex(first, last):
+    """Match every number of first to last digits, without leading zeros"""
+    if first == last:
+        return "[1-9]" + (_any_digits(first - 1) if first > 1 else "")
+    if (first, last) == (1, 2):
+        return "[1-9][0-9]?"
+    return f"[1-9][0-9]{{{first - 1},{last - 1}}}"
+
+
+def _unsigned_to_regex(lo, hi, loose=False):
+    alts = []
+    if loose and lo == 0 and len(str(hi)) > 1:
+        # Every shorter number, leading zeros included, as the original
+        # 64 bit patterns allowed
+        width = len(str(hi))
+        alts.append("[0-9]" if width == 2 else f"[0-9]{{1,{width - 1}}}")
+        lo = 10 ** (width - 1)
+    elif lo == 0 and hi >= 99:
+        # Zero on its own so that 1..9 can join the following full decades
+        alts.append("0")
+        lo = 1
+    # Widths that cover a full decade are merged into a single term
+    decades = None
+    for width in range(len(str(lo)), len(str(hi)) + 1):
+        start = max(lo, 10 ** (width - 1) if width > 1 else 0)
+        end = min(hi, 10 ** width - 1)
+        if start == (10 ** (width - 1) if width > 1 else 1) and end == 10 ** width - 1:
+            decades = (decades[0] if decades else width, width)
+            continue
+        if decades:
+            alts.append(_decades_to_regex(*decades))
+            decades = None
+        alts.extend(_digits_to_regex(str(start), str(end)))
+    if decades:
+        alts.append(_decades_to_regex(*decades))
+    return "(" + "|".join(alts) + ")"
+
+
+@functools.lru_cache(maxsize=None)
+def _range_to_regex(lo, hi, loose=False):
+    """Return a regex that matches the integers from lo to hi
+
+    Numbers must not have leading zeros and zero has no sign, unless loose
+    is set, which reproduces the original int64/uint64 patterns.
+    """
+    if hi < 0:
+        return "-" + _unsigned_to_regex(-hi, -lo)
+    if lo < 0:
+        return ("(-" + _unsigned_to_regex(0 if loose else 1, -lo, loose) + "|" +
+                _unsigned_to_regex(0, hi, loose) + ")")
+    return _unsigned_to_regex(lo, hi, loose)
+
+
+def _int64_pattern(ntype, arg):
+    """Convert a YANG range statement on a 64 bit type into a pattern"""
+    low, high = _INT64_BOUNDS[ntype]
+    bound = {"min": low, "max": high}
+    parts = []
+    for part in arg.split("|"):
+        values = [v.strip() for v in part.split("..")]
+        lo = bound[values[0]] if values[0] in bound else int(values[0])
+        hi = bound[values[-1]] if values[-1] in bound else int(values[-1])
+        parts.append(_range_to_regex(lo, hi))
+    return _group(parts)
+
+
+_INT64_PATTERNS = {t: _range_to_regex(*b, loose=True) for t, b in _INT64_BOUNDS.items()}
+
+# Nothing to omit from a node's children
+_EMPTY = frozenset()
+
+# Keywords that are handled alike
+_LIST_KEYWORDS = frozenset(("list", "leaf-list"))
+_RPC_KEYWORDS = frozenset(("rpc", "action"))
+_IO_KEYWORDS = frozenset(("input", "output"))
+
+XSI_NS = "http://www.w3.org/2001/XMLSchema-instance"
+
+# Help text is flattened onto a single line
+_CR_LF_TO_SPACE = str.maketrans("\r\n", "  ")
+
+# Namespace URI -> (NODE, VALUE) QNames
+_TAG_CACHE = {}
+
+
+def _substmts(stmt):
+    """Map each keyword to its first substatement, as search_one() finds it"""
+    subs = {}
+    for sub in stmt.substmts:
+        subs.setdefault(sub.keyword, sub)
+    return subs
+
+
+def _tags(ns):
+    """Return the (NODE, VALUE) tags for a namespace, building them once"""
+    tags = _TAG_CACHE.get(ns)
+    if tags is None:
+        tags = _TAG_CACHE[ns] = (etree.QName(ns, "NODE"), etree.QName(ns, "VALUE"))
+    return tags
+
+
+def _pattern_of(ntype):
+    """Return the pattern of a type, if it has one"""
+    npatt = ntype.search_one("pattern")
+    return npatt.arg if npatt is not None else None
+
+
+def _new_node(parent, tag, **attrs):
+    """Create a child element with its attributes in the parent's document"""
+    return etree.SubElement(parent, tag, attrs)
 
 
 class ApteryxXMLPlugin(plugin.PyangPlugin):
@@ -163,18 +222,84 @@ class ApteryxXMLPlugin(plugin.PyangPlugin):
             "input": self.rpc,
             "output": self.rpc,
         }
+        self.type_handler = {
+            "string": self.type_string,
+            "boolean": self.type_boolean,
+            "enumeration": self.type_enumeration,
+            "int8": self.type_int,
+            "int16": self.type_int,
+            "int32": self.type_int,
+            "uint8": self.type_int,
+            "uint16": self.type_int,
+            "uint32": self.type_int,
+            "int64": self.type_int64,
+            "uint64": self.type_int64,
+            "union": self.type_union,
+        }
         self.enum_name = ctx.opts.enum_name
+        self._ns_cache = {}
+        self._typedef_type = {}
+
+        # Add any included/imported models
+        for m in module.search("include"):
+            subm = ctx.get_module(m.arg)
+            if subm is not None:
+                modules.append(subm)
+        for m in module.search("import"):
+            subm = ctx.get_module(m.arg)
+            if subm is not None:
+                modules.append(subm)
 
         # Create the root node
-        root = etree.Element("MODULE")
-        root.set("xmlns:xsi", "http://www.w3.org/2001/XMLSchema-instance")
-        root.set("xsi:schemaLocation", "https://github.com/alliedtelesis/apteryx-xml "
+        root = self.create_root(ctx, module, modules)
+        self._root = root
+
+        # Find every node that is, or has a descendant, in the modules namespace
+        self._in_ns = self.nodes_in_namespace(modules, self._ns_of(module))
+
+        # Process all NODEs
+        for m in modules:
+            self.process_children(m, root, module, path)
+
+        # Only declare the namespaces that are actually used
+        etree.cleanup_namespaces(root)
+
+        # Dump output, streaming the encoded document straight to the
+        # underlying binary file when there is one
+        out = getattr(fd, "buffer", None)
+        if out is not None:
+            fd.flush()
+            etree.ElementTree(root).write(out, encoding="UTF-8", xml_declaration=True,
+                                          pretty_print=True)
+        else:
+            fd.write("<?xml version='1.0' encoding='UTF-8'?>\n")
+            fd.write(etree.tostring(root, encoding="unicode", pretty_print=True))
+
+    def create_root(self, ctx, module, modules):
+        # Map all module prefixes to namespaces
+        namespace = self._ns_of(module)
+        prefix = module.search_one('prefix')
+        if namespace is not None:
+            default_ns = namespace.arg
+        else:
+            default_ns = "https://github.com/alliedtelesis/apteryx"
+        prefixes = {}
+        for m in modules:
+            ns = self._ns_of(m)
+            pref = m.search_one('prefix')
+            if ns is not None and pref is not None and ns.arg != default_ns:
+                prefixes[pref.arg] = ns.arg
+        nsmap = {None: default_ns}
+        nsmap.update(sorted(prefixes.items()))
+        nsmap["xsi"] = XSI_NS
+
+        # Describe the main module on the root node
+        root = etree.Element("MODULE", nsmap=nsmap)
+        root.set("{%s}schemaLocation" % XSI_NS, "https://github.com/alliedtelesis/apteryx-xml "
                  "https://github.com/alliedtelesis/apteryx-xml/releases/download/v1.2/apteryx.xsd")
         root.set("model", module.arg)
-        namespace = module.search_one('namespace')
         if namespace is not None:
             root.set("namespace", namespace.arg)
-        prefix = module.search_one('prefix')
         if prefix is not None:
             root.set("prefix", prefix.arg)
         org = module.search_one('organization')
@@ -194,119 +319,102 @@ class ApteryxXMLPlugin(plugin.PyangPlugin):
                 lst.append(os.path.basename(os.path.splitext(x)[0]))
             deviations_string = ','.join(lst)
             root.set("deviations", deviations_string)
-
-        # Add any included/imported models
-        for m in module.search("include"):
-            subm = ctx.get_module(m.arg)
-            if subm is not None:
-                modules.append(subm)
-        for m in module.search("import"):
-            subm = ctx.get_module(m.arg)
-            if subm is not None:
-                modules.append(subm)
-
-        # Register all namespaces
-        for m in modules:
-            ns = m.search_one('namespace')
-            pref = m.search_one('prefix')
-            if ns is not None and pref is not None:
-                etree.register_namespace(pref.arg, ns.arg)
-        if namespace is not None:
-            if prefix is not None:
-                etree.register_namespace(prefix.arg, namespace.arg)
-            # This must be last!
-            etree.register_namespace("", namespace.arg)
-        else:
-            etree.register_namespace("", "https://github.com/alliedtelesis/apteryx")
-
-        # Process all NODEs
-        for m in modules:
-            self.process_children(m, root, module, path)
-
-        # Dump output
-        self.format(root, indent="  ")
-        stream = io.BytesIO()
-        etree.ElementTree(root).write(stream, 'UTF-8', xml_declaration=True)
-        fd.write(stream.getvalue().decode('UTF-8'))
-
-    def format(self, elem, level=0, indent="  "):
-        i = "\n" + level * indent
-        if len(elem):
-            if not elem.text or not elem.text.strip():
-                elem.text = i + indent
-            if not elem.tail or not elem.tail.strip():
-                elem.tail = i
-            for elem in elem:
-                self.format(elem, level + 1, indent)
-            if not elem.tail or not elem.tail.strip():
-                elem.tail = i
-        else:
-            if level and (not elem.tail or not elem.tail.strip()):
-                elem.tail = i
+        return root
 
     def ignore(self, node, elem, module, path):
-        pass
-
-    def process_children(self, node, elem, module, path, omit=[]):
-        for ch in node.i_children:
-            if ch not in omit:
-                self.node_handler.get(ch.keyword, self.ignore)(
-                    ch, elem, module, path)
+        return ()
+
+    def process_children(self, node, elem, module, path):
+        # Walk the tree with an explicit stack rather than recursing. Each
+        # handler returns the children it wants visited next, which are
+        # pushed in reverse so that nodes are still emitted in schema order.
+        get_handler = self.node_handler.get
+        ignore = self.ignore
+        stack = self.children(node, elem, module, path)[::-1]
+        while stack:
+            ch, el, mod, p = stack.pop()
+            items = get_handler(ch.keyword, ignore)(ch, el, mod, p)
+            stack.extend(reversed(items))
+
+    def children(self, node, elem, module, path, omit=_EMPTY):
+        return [(ch, elem, module, path) for ch in node.i_children
+                if id(ch) not in omit and id(ch) in self._in_ns]
 
     def rpc(self, node, elem, module, path):
-        if (node.keyword == 'input' or node.keyword == 'output') and len(node.substmts) == 0:
-            return
+        if node.keyword in _IO_KEYWORDS and len(node.substmts) == 0:
+            return ()
         parent = elem
         if node.keyword == 'rpc':
-            root = elem
-            while root.find('..'):
-                root = root.find('..')
+            root = self._root
             parent = root.find(".//NODE[@name='operations']")
             if parent is None:
-                parent = etree.SubElement(root, "NODE")
-                parent.attrib = OrderedDict()
-                parent.attrib["name"] = "operations"
+                parent = _new_node(root, "NODE", name="operations")
         nel, newm, path = self.sample_element(node, parent, module, path)
         if path is None:
-            return
-        self.process_children(node, nel, newm, path)
+            return ()
+        return self.children(node, nel, newm, path)
 
     def container(self, node, elem, module, path):
         nel, newm, path = self.sample_element(node, elem, module, path)
         if path is None:
-            return
-        self.process_children(node, nel, newm, path)
+            return ()
+        return self.children(node, nel, newm, path)
 
     def choice(self, node, elem, module, path):
-        self.process_children(node, elem, module, path)
+        return self.children(node, elem, module, path)
 
     def case(self, node, elem, module, path):
-        self.process_children(node, elem, module, path)
+        return self.children(node, elem, module, path)
 
     def leaf(self, node, elem, module, path):
         nel, newm, path = self.sample_element(node, elem, module, path)
+        return ()
 
     def list(self, node, elem, module, path):
         nel, newm, path = self.sample_element(node, elem, module, path)
         if path is None:
-            return
-        for kn in node.i_key:
-            self.node_handler.get(kn.keyword, self.ignore)(
-                kn, nel, newm, path)
-        self.process_children(node, nel, newm, path, node.i_key)
+            return ()
+        # Keys are always emitted before the other children
+        keys = [(kn, nel, newm, path) for kn in node.i_key]
+        omit = frozenset(id(kn) for kn in node.i_key)
+        return keys + self.children(node, nel, newm, path, omit)
 
     def leaf_list(self, node, elem, module, path):
         nel, newm, path = self.sample_element(node, elem, module, path)
+        return ()
 
-    def node_in_namespace(self, node, ns):
-        chns = node.i_module.search_one('namespace')
-        if chns is not None and chns == ns:
-            return True
-        if (hasattr(node, "i_children")):
-            for ch in node.i_children:
-                if self.node_in_namespace(ch, ns):
-                    return True
-        return False
+    def _ns_of(self, mod):
+        if id(mod) not in self._ns_cache:
+            self._ns_cache[id(mod)] = mod.search_one('namespace')
+        return self._ns_cache[id(mod)]
+
+    def nodes_in_namespace(self, modules, ns):
+        # A single post-order walk of all the modules, marking a node when it
+        # or any of its children is in the namespace
+        found = set()
+        for m in modules:
+            stack = [(ch, False) for ch in m.i_children]
+            while stack:
+                n, expanded = stack.pop()
+                children = getattr(n, "i_children", [])
+                if expanded:
+                    if any(id(ch) in found for ch in children):
+                        found.add(id(n))
+                    continue
+                chns = self._ns_of(n.i_module)
+                if chns is not None and chns == ns:
+                    found.add(id(n))
+                stack.append((n, True))
+                stack.extend((ch, False) for ch in children)
+        return found
+
+    def _resolved_type(self, ntype):
+        if ntype is None or ntype.i_typedef is None:
+            return ntype
+        key = id(ntype.i_typedef)
+        if key not in self._typedef_type:
+            self._typedef_type[key] = ntype.i_typedef.search_one("type")
+        return self._typedef_type[key]
 
     def node_descendant_of(self, node, keyword):
         while node.parent is not None:
@@ -326,13 +434,12 @@ class ApteryxXMLPlugin(plugin.PyangPlugin):
             else:
                 return parent, module, None
         # Do not keep this node if it or its children are not in the modules namespace
-        if not self.node_in_namespace(node, module.search_one('namespace')):
+        if id(node) not in self._in_ns:
             return parent, module, None
-        ns = node.i_module.search_one('namespace')
-        res = etree.SubElement(parent, "{" + ns.arg + "}NODE")
-        res.attrib = OrderedDict()
-        res.attrib["name"] = node.arg
-        if node.keyword == 'rpc' or node.keyword == 'action':
+        ns = self._ns_of(node.i_module)
+        node_tag, value_tag = _tags(ns.arg)
+        res = _new_node(parent, node_tag, name=node.arg)
+        if node.keyword in _RPC_KEYWORDS:
             res.attrib["mode"] = "rwx"
         if node.keyword == 'leaf':
             if node.i_config:
@@ -345,16 +452,14 @@ class ApteryxXMLPlugin(plugin.PyangPlugin):
                 res.attrib["mode"] = "r"
             if node.i_default is not None:
                 res.attrib["default"] = node.i_default_str
-        descr = node.search_one('description')
+        subs = _substmts(node)
+        descr = subs.get('description')
         if descr is not None:
-            descr.arg = descr.arg.replace('\r', ' ').replace('\n', ' ')
-            res.attrib["help"] = descr.arg
-
-        if node.keyword is not None and (node.keyword == "list" or node.keyword == "leaf-list"):
-            res = etree.SubElement(res, "{" + ns.arg + "}NODE")
-            res.attrib = OrderedDict()
-            res.attrib["name"] = "*"
-            key = node.search_one("key")
+            res.attrib["help"] = descr.arg.translate(_CR_LF_TO_SPACE)
+
+        if node.keyword in _LIST_KEYWORDS:
+            res = _new_node(res, node_tag, name="*")
+            key = subs.get("key")
             if node.keyword == "leaf-list":
                 if node.i_config:
                     res.attrib["mode"] = "rw"
@@ -365,85 +470,61 @@ class ApteryxXMLPlugin(plugin.PyangPlugin):
             else:
                 res.attrib["help"] = "List of " + node.arg
 
-        ntype = node.search_one("type")
-        if ntype and ntype.i_typedef is not None:
-            ntype = ntype.i_typedef.search_one("type")
+        ntype = self._resolved_type(subs.get("type"))
         if ntype is not None:
-            if ntype.arg == "string":
-                npatt = ntype.search_one("pattern")
-                if npatt is not None:
-                    res.attrib["pattern"] = npatt.arg
-            elif ntype.arg == "boolean":
-                value = etree.SubElement(res, "{" + ns.arg + "}VALUE")
-                value.attrib = OrderedDict()
-                value.attrib["name"] = "true"
-                value.attrib["value"] = "true"
-                value = etree.SubElement(res, "{" + ns.arg + "}VALUE")
-                value.attrib = OrderedDict()
-                value.attrib["name"] = "false"
-                value.attrib["value"] = "false"
-            elif ntype.arg == "enumeration":
-                count = 0
-                for enum in ntype.substmts:
-                    value = etree.SubElement(res, "{" + ns.arg + "}VALUE")
-                    value.attrib = OrderedDict()
-                    value.attrib["name"] = enum.arg
-                    val = enum.search_one('value')
-                    if val is not None:
-                        value.attrib["value"] = val.arg
-                        try:
-                            val_int = int(val.arg)
-                        except ValueError:
-                            val_int = None
-                        if val_int is not None:
-                            count = val_int
-                    else:
-                        if self.enum_name:
-                            value.attrib["value"] = value.attrib["name"]
-                        else:
-                            value.attrib["value"] = str(count)
-                    count = count + 1
-                    descr = enum.search_one('description')
-                    if descr is not None:
-                        descr.arg = descr.arg.replace('\r', ' ').replace('\n', ' ')
-                        value.attrib["help"] = descr.arg
-            elif ntype.arg in ["int8", "int16", "int32", "uint8", "uint16", "uint32"]:
-                range = ntype.search_one("range")
-                if range is not None:
-                    res.attrib["range"] = range.arg
-                elif ntype.arg == "int8":
-                    res.attrib["range"] = "-128..127"
-                elif ntype.arg == "int16":
-                    res.attrib["range"] = "-32768..32767"
-                elif ntype.arg == "int32":
-                    res.attrib["range"] = "-2147483648..2147483647"
-                elif ntype.arg == "uint8":
-                    res.attrib["range"] = "0..255"
-                elif ntype.arg == "uint16":
-                    res.attrib["range"] = "0..65535"
-                elif ntype.arg == "uint32":
-                    res.attrib["range"] = "0..4294967295"
-            elif ntype.arg in ["int64", "uint64"]:
-                # These values are actually encoded as strings
-                range = ntype.search_one("range")
-                if range is not None:
-                    # TODO convert range into a regex pattern
-                    res.attrib["range"] = range.arg
-                elif ntype.arg == "int64":
-                    # range="-9223372036854775808..9223372036854775807"
-                    res.attrib["pattern"] = "(-([0-9]{1,18}|[1-8][0-9]{18}|9([01][0-9]{17}|2([01][0-9]{16}|2([0-2][0-9]{15}|3([0-2][0-9]{14}|3([0-6][0-9]{13}|7([01][0-9]{12}|20([0-2][0-9]{10}|3([0-5][0-9]{9}|6([0-7][0-9]{8}|8([0-4][0-9]{7}|5([0-3][0-9]{6}|4([0-6][0-9]{5}|7([0-6][0-9]{4}|7([0-4][0-9]{3}|5([0-7][0-9]{2}|80[0-8]))))))))))))))))|([0-9]{1,18}|[1-8][0-9]{18}|9([01][0-9]{17}|2([01][0-9]{16}|2([0-2][0-9]{15}|3([0-2][0-9]{14}|3([0-6][0-9]{13}|7([01][0-9]{12}|20([0-2][0-9]{10}|3([0-5][0-9]{9}|6([0-7][0-9]{8}|8([0-4][0-9]{7}|5([0-3][0-9]{6}|4([0-6][0-9]{5}|7([0-6][0-9]{4}|7([0-4][0-9]{3}|5([0-7][0-9]{2}|80[0-7])))))))))))))))))"
-                elif ntype.arg == "uint64":
-                    # range="0..18446744073709551615"
-                    res.attrib["pattern"] = "([0-9]{1,19}|1([0-7][0-9]{18}|8([0-3][0-9]{17}|4([0-3][0-9]{16}|4([0-5][0-9]{15}|6([0-6][0-9]{14}|7([0-3][0-9]{13}|4([0-3][0-9]{12}|40([0-6][0-9]{10}|7([0-2][0-9]{9}|3([0-6][0-9]{8}|70([0-8][0-9]{6}|9([0-4][0-9]{5}|5([0-4][0-9]{4}|5(0[0-9]{3}|1([0-5][0-9]{2}|6(0[0-9]|1[0-5])))))))))))))))))"
-            elif ntype.arg == 'union':
-                uniontypes = ntype.search('type')
-                upatt = []
-                for uniontype in uniontypes:
-                    if uniontype.i_typedef:
-                        ut = uniontype.i_typedef.search_one("type")
-                        npatt = ut.search_one("pattern")
-                        if npatt is not None:
-                            upatt.append(f"(^{npatt.arg}$)")
-                if len(upatt) > 0:
-                    res.attrib["pattern"] = "|".join(upatt)
+            self.type_handler.get(ntype.arg, self.ignore_type)(ntype, res, value_tag)
         return res, module, path
+
+    def ignore_type(self, ntype, res, value_tag):
+        pass
+
+    def type_string(self, ntype, res, value_tag):
+        npatt = ntype.search_one("pattern")
+        if npatt is not None:
+            res.attrib["pattern"] = npatt.arg
+
+    def type_boolean(self, ntype, res, value_tag):
+        _new_node(res, value_tag, name="true", value="true")
+        _new_node(res, value_tag, name="false", value="false")
+
+    def type_enumeration(self, ntype, res, value_tag):
+        count = 0
+        for enum in ntype.substmts:
+            attrs = {"name": enum.arg}
+            esubs = _substmts(enum)
+            val = esubs.get('value')
+            if val is not None:
+                attrs["value"] = val.arg
+                digits = val.arg[1:] if val.arg.startswith('-') else val.arg
+                if digits.isdecimal():
+                    count = int(val.arg)
+            else:
+                if self.enum_name:
+                    attrs["value"] = enum.arg
+                else:
+                    attrs["value"] = str(count)
+            count = count + 1
+            descr = esubs.get('description')
+            if descr is not None:
+                attrs["help"] = descr.arg.translate(_CR_LF_TO_SPACE)
+            etree.SubElement(res, value_tag, attrs)
+
+    def type_int(self, ntype, res, value_tag):
+        range = ntype.search_one("range")
+        res.attrib["range"] = range.arg if range is not None else _INT_RANGES[ntype.arg]
+
+    def type_int64(self, ntype, res, value_tag):
+        # These values are actually encoded as strings
+        range = ntype.search_one("range")
+        if range is not None:
+            res.attrib["pattern"] = _int64_pattern(ntype.arg, range.arg)
+        else:
+            res.attrib["pattern"] = _INT64_PATTERNS[ntype.arg]
+
+    def type_union(self, ntype, res, value_tag):
+        # Only members defined by a typedef contribute a pattern
+        uniontypes = [self._resolved_type(s) for s in ntype.substmts
+                      if s.keyword == 'type' and s.i_typedef]
+        upatt = [f"(^{p}$)" for p in map(_pattern_of, uniontypes) if p is not None]
+        if upatt:
+            res.attrib["pattern"] = "|".join(upatt)
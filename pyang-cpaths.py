@@ -3,9 +3,26 @@
 Output paths in C header file format
 
 """
+import io
 import optparse
 
-from pyang import plugin, statements
+from pyang import plugin
+
+
+# Nodes that are not output
+_SKIP_KEYWORDS = frozenset(("rpc", "notification"))
+# Nodes that are passed through to their children
+_CHOICE_KEYWORDS = frozenset(("choice", "case"))
+# Nodes that do not appear in the schema path
+_PATHLESS_KEYWORDS = frozenset(("case", "input", "output"))
+_MODULE_KEYWORDS = frozenset(("module", "submodule"))
+_CONTAINER_KEYWORDS = frozenset(("container", "list"))
+
+# Path separators and dashes are not valid in a define name
+_DEFINE_TRANS = str.maketrans("/-", "__")
+
+# Descriptions are flattened onto a single line
+_CR_LF_TO_SPACE = str.maketrans("\r\n", "  ")
 
 
 def pyang_plugin_init():
@@ -37,23 +54,31 @@ class PathPlugin(plugin.PyangPlugin):
     def emit(self, ctx, modules, fd):
         self.prefix_default = ctx.opts.prefix_default
         self.prefix = {}
+        self._path_cache = {}
         if (self.prefix_default):
             for module in modules:
                 pref = module.search_one('prefix')
                 if pref is not None:
                     self.prefix[module] = pref.arg
 
+        # Collect the output and write it in one go
+        buf = io.StringIO()
         for module in modules:
             prefix = self.prefix.get(module)
-            children = [child for child in module.i_children]
-            for child in children:
-                print_node(child, module, prefix, fd, ctx)
-        fd.write('\n')
+            # Depth first walk with an explicit stack, pushing each node's
+            # children in reverse so that they are output in schema order
+            stack = [(child, 0, 0) for child in reversed(module.i_children)]
+            while stack:
+                node, level, strip = stack.pop()
+                children = print_node(node, module, prefix, buf, ctx, self._path_cache, level, strip)
+                stack.extend(reversed(children))
+        buf.write('\n')
+        fd.write(buf.getvalue())
 
 
 def mk_path_str(s, prefix, level=0, strip=0, fd=None):
     # print('LEVEL: ' + str(level) + ' STRIP:' + str(strip) + ' ' + s.arg)
-    if s.keyword in ['choice', 'case']:
+    if s.keyword in _CHOICE_KEYWORDS:
         return mk_path_str(s.parent, prefix, level, strip)
     if level > strip:
         p = mk_path_str(s.parent, prefix, level - 1, strip)
@@ -68,8 +93,27 @@ def mk_path_str(s, prefix, level=0, strip=0, fd=None):
         return ""
 
 
+def mk_path_str_schema(s, cache):
+    """statements.mk_path_str(s, False), reusing the cached paths of ancestors"""
+    chain = []
+    while id(s) not in cache:
+        chain.append(s)
+        if s.parent.keyword in _MODULE_KEYWORDS and s.keyword not in _PATHLESS_KEYWORDS:
+            path = ""
+            break
+        s = s.parent
+    else:
+        path = cache[id(s)]
+    for s in reversed(chain):
+        # Cases, inputs and outputs do not appear in the path
+        if s.keyword not in _PATHLESS_KEYWORDS:
+            path = path + "/" + s.arg
+        cache[id(s)] = path
+    return path
+
+
 def mk_path_str_define(s, prefix, level):
-    if s.parent.keyword in ['module', 'submodule']:
+    if s.parent.keyword in _MODULE_KEYWORDS:
         if level == 0 and prefix is not None:
             return "/" + prefix + "/" + s.arg
         return "/" + s.arg
@@ -78,22 +122,21 @@ def mk_path_str_define(s, prefix, level):
         return p + "/" + s.arg
 
 
-def print_node(node, module, prefix, fd, ctx, level=0, strip=0):
+def print_node(node, module, prefix, fd, ctx, paths, level=0, strip=0):
+    """Output the defines for a node and return the (node, level, strip) of its children"""
     # print('TYPE:' + node.keyword + 'LEVEL:' + str(level) + 'STRIP:' + str(strip))
 
     # No need to include these nodes
-    if node.keyword in ['rpc', 'notification']:
-        return
+    if node.keyword in _SKIP_KEYWORDS:
+        return []
 
     # Strip all nodes from the path at list items
     if node.parent.keyword == 'list':
         strip = level
 
     # Skip over choice and case
-    if node.keyword in ['choice', 'case']:
-        for child in node.i_children:
-            print_node(child, module, prefix, fd, ctx, level, strip)
-        return
+    if node.keyword in _CHOICE_KEYWORDS:
+        return [(child, level, strip) for child in node.i_children]
 
     # Create path value
     value = mk_path_str(node, prefix, level, strip, fd)
@@ -101,54 +144,43 @@ def print_node(node, module, prefix, fd, ctx, level=0, strip=0):
         value = "/" + value
 
     # Create define
-    if node.keyword in ['choice', 'case']:
+    if node.keyword in _CHOICE_KEYWORDS:
         pathstr = mk_path_str_define(node, prefix, level)
     else:
-        pathstr = statements.mk_path_str(node, False)
+        pathstr = mk_path_str_schema(node, paths)
     if prefix is not None:
         pathstr = '_' + prefix + pathstr
-    if node.keyword in ('container', 'list'):
-        define = pathstr[1:].upper().replace('/', '_').replace('-', '_') + '_PATH'
+    if node.keyword in _CONTAINER_KEYWORDS:
+        define = pathstr[1:].upper().translate(_DEFINE_TRANS) + '_PATH'
     # Hack to stop duplicate defines when list variable is called "path"
-    elif node.parent.keyword in ('list', 'container') and (value.upper() == 'PATH' or value.upper().endswith('/PATH')):
-        sc = pathstr[1:].count('/')
-        define = pathstr[1:].upper().replace('/', '_', sc - 1).replace('/', '__').replace('-', '_')
+    elif node.parent.keyword in _CONTAINER_KEYWORDS and ('/' + value.upper()).endswith('/PATH'):
+        head, _, tail = pathstr[1:].upper().rpartition('/')
+        define = head.translate(_DEFINE_TRANS) + '__' + tail.translate(_DEFINE_TRANS)
     else:
-        define = pathstr[1:].upper().replace('/', '_').replace('-', '_')
+        define = pathstr[1:].upper().translate(_DEFINE_TRANS)
+
+    out = []
 
     # Description
     descr = node.search_one('description')
     if descr is not None:
-        descr.arg = descr.arg.replace('\r', ' ').replace('\n', ' ')
-        fd.write('/* ' + descr.arg + ' */\n')
+        out.append(f'/* {descr.arg.translate(_CR_LF_TO_SPACE)} */\n')
 
     # Ouput define
-    fd.write('#define ' + define + ' "' + value + '"\n')
+    out.append(f'#define {define} "{value}"\n')
 
     ntype = node.search_one('type')
+    def_val = node.search_one('default')
     if ntype is not None and ntype.arg in module.i_typedefs:
-        typedef = module.i_typedefs[ntype.arg].copy()
-        typedef.arg = node.arg
-        ndescr = node.search_one('description')
-        if ndescr is not None:
-            tdescr = typedef.search_one('description')
-            if tdescr is None:
-                typedef.substmts.append(ndescr)
-            else:
-                tdescr.arg = ndescr.arg
-        typedef.i_config = node.i_config
-        if node.i_default is not None:
-            typedef.i_default = node.i_default
-            if hasattr(node, "i_default_str"):
-                typedef.i_default_str = node.i_default_str
-        typedef.keyword = node.keyword
-        node = typedef
-        ntype = node.search_one('type')
+        # Local typedefs provide both the type and the default
+        typedef = module.i_typedefs[ntype.arg]
+        ntype = typedef.search_one('type')
+        def_val = typedef.search_one('default')
 
     if ntype is not None:
         if ntype.arg == 'boolean':
-            fd.write('#define ' + define + '_TRUE "true"\n')
-            fd.write('#define ' + define + '_FALSE "false"\n')
+            out.append(f'#define {define}_TRUE "true"\n')
+            out.append(f'#define {define}_FALSE "false"\n')
 
         if ntype.arg == 'enumeration':
             count = 0
@@ -156,22 +188,18 @@ def print_node(node, module, prefix, fd, ctx, level=0, strip=0):
                 name = enum.arg.replace('-', '_').upper()
                 val = enum.search_one('value')
                 if val is not None:
-                    fd.write('#define ' + define + '_' + name + ' ' + str(val.arg) + '\n')
-                    try:
-                        val_int = int(val.arg)
-                    except ValueError:
-                        val_int = None
-                    if val_int is not None:
-                        count = val_int
+                    out.append(f'#define {define}_{name} {val.arg}\n')
+                    digits = val.arg[1:] if val.arg.startswith('-') else val.arg
+                    if digits.isdecimal():
+                        count = int(val.arg)
                 else:
                     if ctx.opts.enum_name:
-                        fd.write('#define ' + define + '_' + name + ' "' + enum.arg + '"\n')
+                        out.append(f'#define {define}_{name} "{enum.arg}"\n')
                     else:
-                        fd.write('#define ' + define + '_' + name + ' ' + str(count) + '\n')
+                        out.append(f'#define {define}_{name} {count}\n')
                 count = count + 1
 
     # Default value
-    def_val = node.search_one('default')
     if def_val is not None:
         # For enums the default is the associated value
         if ntype is not None and ntype.arg == 'enumeration':
@@ -179,19 +207,19 @@ def print_node(node, module, prefix, fd, ctx, level=0, strip=0):
             if enum:
                 val = enum.search_one('value')
                 if val:
-                    fd.write('#define ' + define + '_DEFAULT ' + str(val.arg) + '\n')
+                    out.append(f'#define {define}_DEFAULT {val.arg}\n')
                 elif ctx.opts.enum_name:
-                    fd.write('#define ' + define + '_DEFAULT "' + def_val.arg + '"\n')
+                    out.append(f'#define {define}_DEFAULT "{def_val.arg}"\n')
                 else:
-                    fd.write('#define ' + define + '_DEFAULT ' + str(ntype.substmts.index(enum)) + '\n')
+                    out.append(f'#define {define}_DEFAULT {ntype.substmts.index(enum)}\n')
             else:
-                raise Exception("Could not find default \"" + def_val.arg + "\" in " + str(node))
+                raise Exception(f'Could not find default "{def_val.arg}" in {node}')
         elif ntype is not None and 'int' in ntype.arg:
-            fd.write('#define ' + define + '_DEFAULT ' + def_val.arg + '\n')
+            out.append(f'#define {define}_DEFAULT {def_val.arg}\n')
         else:
-            fd.write('#define ' + define + '_DEFAULT "' + def_val.arg + '"\n')
+            out.append(f'#define {define}_DEFAULT "{def_val.arg}"\n')
+
+    fd.write("".join(out))
 
-    # Process children
-    if hasattr(node, 'i_children'):
-        for child in node.i_children:
-            print_node(child, module, prefix, fd, ctx, level + 1, strip)
+    # Children to process next
+    return [(child, level + 1, strip) for child in getattr(node, 'i_children', [])]